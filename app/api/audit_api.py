@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.models import AuditEntityType
+from app.schemes import AuditEntry
+from app.services.audit_service import AuditService
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+@router.get("/{entity_type}/{entity_id}", response_model=List[AuditEntry])
+async def get_entity_history(
+        entity_type: AuditEntityType,
+        entity_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        offset: int = 0,
+        limit: int = 50,
+        audit_service: AuditService = Depends()
+):
+    entries = await audit_service.list_entity_history(entity_type, entity_id, since, until, offset, limit)
+    return [AuditEntry.model_validate(e) for e in entries]
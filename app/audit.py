@@ -0,0 +1,434 @@
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import socket
+import uuid
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models import AuditAction, AuditEntityType, AuditLogModel, MeasurementModel, PatientModel, VisitModel
+
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_SEGMENT_SIZE = int(os.environ.get("AUDIT_SEGMENT_SIZE", "5000"))
+AUDIT_JOURNAL_DIR = os.environ.get("AUDIT_JOURNAL_DIR", "/tmp/clinical_trials_audit")
+AUDIT_FSYNC_ON_COMMIT = os.environ.get("AUDIT_FSYNC_ON_COMMIT", "false").lower() == "true"
+AUDIT_ORPHAN_SCAN_INTERVAL = float(os.environ.get("AUDIT_ORPHAN_SCAN_INTERVAL", "30.0"))
+
+AUDITED_MODELS = {
+    PatientModel: AuditEntityType.PATIENT,
+    VisitModel: AuditEntityType.VISIT,
+    MeasurementModel: AuditEntityType.MEASUREMENT,
+}
+
+logger = logging.getLogger(__name__)
+
+
+class _JournalSegment:
+    """
+    One journal file, exclusively locked by the process that writes or replays it.
+
+    ``written`` and ``stored`` count records appended to the file and records
+    the writer has committed to the database, so the file can be dropped as
+    soon as everything in it is stored.
+    """
+
+    def __init__(self, path: str, file: BinaryIO, sealed: bool = False, needs_replay: bool = False):
+        self.path = path
+        self.file = file
+        self.sealed = sealed
+        self.needs_replay = needs_replay
+        self.replayed = False
+        self.replay_offset = 0
+        self.unsynced = False
+        self.written = 0
+        self.stored = 0
+
+    @property
+    def done(self) -> bool:
+        return self.replayed or (not self.needs_replay and self.stored >= self.written)
+
+    def append(self, records: list[dict[str, Any]]):
+        self.file.write(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+        self.file.flush()
+        self.unsynced = True
+        self.written += len(records)
+
+    def truncate(self):
+        self.file.truncate(0)
+        self.written = self.stored = 0
+        self.replay_offset = 0
+
+    def close(self, remove: bool):
+        # Unlink before closing so the name is gone before the lock is released.
+        if remove:
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+        self.file.close()
+
+
+class AuditWriter:
+    """
+    Buffers audit records in a bounded in-memory queue and writes them to the
+    database in multi-row batches from a background task.
+
+    Every record is first appended to a journal segment owned by this process
+    (named after host and pid, and held under ``flock``). Segments are sealed
+    every ``segment_size`` records and deleted once all their records are
+    stored, so the journal stays bounded under steady load. A batch that fails
+    to insert is retried; rows the database rejects outright are moved to a
+    dead-letter file so they cannot block the rest. Segments whose records
+    overflowed the queue, and segments left behind by dead processes (claimed
+    on start and every ``orphan_scan_interval`` seconds), are replayed from
+    disk in chunks. Replays are idempotent thanks to the unique ``event_id``.
+
+    Journal writes are flushed to the OS on every commit, so a process crash
+    loses nothing. They are fsynced off the event loop: once per flush
+    interval by default, or right after each commit (grouping concurrent
+    commits into one fsync) with ``fsync_on_commit``. Requests never wait for
+    the fsync, so a host crash or power loss can still lose the records
+    written since the last one.
+    """
+
+    def __init__(self, journal_dir: str, queue_size: int, batch_size: int, flush_interval: float,
+                 segment_size: int, fsync_on_commit: bool = False, orphan_scan_interval: float = 30.0):
+        self.journal_dir = journal_dir
+        self.dead_letter_path = os.path.join(journal_dir, "dead-letter.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+        self.fsync_on_commit = fsync_on_commit
+        self.orphan_scan_interval = orphan_scan_interval
+        self._queue: asyncio.Queue[tuple[Optional[_JournalSegment], dict[str, Any]]] = \
+            asyncio.Queue(maxsize=queue_size)
+        self._segments: list[_JournalSegment] = []
+        # Guards segment files against being closed while an fsync is running on them.
+        self._segments_lock = asyncio.Lock()
+        self._active: Optional[_JournalSegment] = None
+        # Records taken off the queue but not yet stored; kept on the writer so a
+        # cancelled or failed flush does not lose them.
+        self._pending: list[tuple[Optional[_JournalSegment], dict[str, Any]]] = []
+        self._sync_requested = asyncio.Event()
+        # Replaying a segment revisits records already dead-lettered from the queue.
+        self._dead_lettered: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._claim_orphaned_segments()
+        self._tasks.append(asyncio.create_task(self._run()))
+        if self.fsync_on_commit:
+            self._tasks.append(asyncio.create_task(self._sync_on_commit()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+        while not self._queue.empty():
+            self._pending.append(self._queue.get_nowait())
+        if self._active is not None:
+            self._seal(self._active)
+        await self._flush()
+
+        # Segments that are not fully stored stay on disk and are claimed on the next start.
+        for segment in self._segments:
+            segment.close(remove=segment.done)
+        self._segments = []
+
+    def submit(self, records: list[dict[str, Any]]):
+        segment = None
+        try:
+            segment = self._active_segment()
+            segment.append(records)
+        except Exception:
+            logger.exception("Failed to journal %d audit records", len(records))
+            segment = None
+
+        if segment is not None and self.fsync_on_commit:
+            self._sync_requested.set()
+
+        for record in records:
+            try:
+                self._queue.put_nowait((segment, record))
+            except asyncio.QueueFull:
+                if segment is None:
+                    logger.error("Audit queue is full, dropping record %s", record["event_id"])
+                    continue
+                segment.needs_replay = True
+
+    def _active_segment(self) -> _JournalSegment:
+        if self._active is not None and self._active.written >= self.segment_size:
+            self._seal(self._active)
+        if self._active is None:
+            name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex}.jsonl"
+            path = os.path.join(self.journal_dir, name)
+            # Lock under a temporary name so other processes never see an unlocked segment.
+            file = open(path + ".new", "ab")
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.rename(path + ".new", path)
+            self._active = _JournalSegment(path, file)
+            self._segments.append(self._active)
+        return self._active
+
+    def _seal(self, segment: _JournalSegment):
+        segment.sealed = True
+        if segment is self._active:
+            self._active = None
+
+    def _claim_orphaned_segments(self):
+        owned = {segment.path for segment in self._segments}
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if not name.endswith(".jsonl") or path in owned or path == self.dead_letter_path:
+                continue
+            try:
+                file = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                continue
+            logger.info("Claimed audit journal %s for replay", name)
+            self._segments.append(_JournalSegment(path, file, sealed=True, needs_replay=True))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_orphan_scan = loop.time() + self.orphan_scan_interval
+        while True:
+            if self._pending:
+                # The previous insert failed; retry it before taking more records.
+                await asyncio.sleep(self.flush_interval)
+            else:
+                await self._collect_batch()
+
+            if loop.time() >= next_orphan_scan:
+                next_orphan_scan = loop.time() + self.orphan_scan_interval
+                try:
+                    self._claim_orphaned_segments()
+                except OSError:
+                    logger.exception("Failed to scan audit journal directory %s", self.journal_dir)
+
+            await self._flush()
+
+    async def _collect_batch(self):
+        with suppress(TimeoutError):
+            async with asyncio.timeout(self.flush_interval):
+                while len(self._pending) < self.batch_size:
+                    self._pending.append(await self._queue.get())
+
+    async def _sync_on_commit(self):
+        while True:
+            await self._sync_requested.wait()
+            self._sync_requested.clear()
+            await self._sync_segments()
+
+    async def _flush(self):
+        await self._sync_segments()
+
+        batch = self._pending
+        if batch:
+            try:
+                await self._store([record for _, record in batch])
+            except Exception:
+                logger.exception("Failed to store %d audit records, will retry", len(batch))
+                return
+            self._pending = []
+            for segment, _ in batch:
+                if segment is not None:
+                    segment.stored += 1
+
+        # Records that overflowed the queue are only on disk; seal their segment so it can be replayed.
+        if self._active is not None and self._active.needs_replay:
+            self._seal(self._active)
+        for segment in [s for s in self._segments if s.needs_replay and s.sealed]:
+            try:
+                await self._replay(segment)
+            except Exception:
+                logger.exception("Failed to replay audit journal %s, will retry", segment.path)
+                break
+
+        await self._release_segments()
+
+    async def _sync_segments(self):
+        async with self._segments_lock:
+            for segment in self._segments:
+                if segment.unsynced:
+                    segment.unsynced = False
+                    try:
+                        await asyncio.to_thread(os.fsync, segment.file.fileno())
+                    except OSError:
+                        logger.exception("Failed to fsync audit journal %s", segment.path)
+
+    async def _release_segments(self):
+        async with self._segments_lock:
+            for segment in list(self._segments):
+                if not segment.done:
+                    continue
+                if segment is self._active:
+                    if segment.written:
+                        segment.truncate()
+                    continue
+                segment.close(remove=True)
+                self._segments.remove(segment)
+
+    async def _replay(self, segment: _JournalSegment):
+        with open(segment.path, "rb") as journal:
+            journal.seek(segment.replay_offset)
+            records = []
+            for line in journal:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupted audit journal entry in %s: %r", segment.path, line)
+                if len(records) >= self.batch_size:
+                    await self._store(records)
+                    segment.replay_offset = journal.tell()
+                    records = []
+            if records:
+                await self._store(records)
+        segment.needs_replay = False
+        segment.replayed = True
+
+    async def _store(self, records: list[dict[str, Any]]):
+        try:
+            await self._insert(records)
+            return
+        except Exception as exc:
+            if not _is_rejected(exc):
+                raise
+
+        # Some row is invalid; insert one by one so it cannot hold back the others.
+        for record in records:
+            try:
+                await self._insert([record])
+            except Exception as exc:
+                if not _is_rejected(exc):
+                    raise
+                self._dead_letter(record, exc)
+
+    def _dead_letter(self, record: dict[str, Any], exc: Exception):
+        if record.get("event_id") in self._dead_lettered:
+            return
+        logger.error("Audit record %s rejected, moved to %s: %s", record.get("event_id"), self.dead_letter_path, exc)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter:
+            dead_letter.write(json.dumps({"record": record, "error": str(exc)}, default=str) + "\n")
+        self._dead_lettered.add(record.get("event_id"))
+
+    async def _insert(self, records: list[dict[str, Any]]):
+        rows = [
+            {
+                **record,
+                "event_id": uuid.UUID(record["event_id"]),
+                "created_at": datetime.fromisoformat(record["created_at"]),
+            }
+            for record in records
+        ]
+        stmt = insert(AuditLogModel).on_conflict_do_nothing(index_elements=[AuditLogModel.event_id])
+        async with engine.begin() as conn:
+            for i in range(0, len(rows), self.batch_size):
+                await conn.execute(stmt, rows[i:i + self.batch_size])
+
+
+def _is_rejected(exc: Exception) -> bool:
+    """Tells errors caused by the record itself apart from the database being unavailable."""
+    if isinstance(exc, (DataError, IntegrityError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        return False
+    return isinstance(exc, (StatementError, ValueError, KeyError, TypeError))
+
+
+audit_writer = AuditWriter(AUDIT_JOURNAL_DIR, AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL,
+                           AUDIT_SEGMENT_SIZE, AUDIT_FSYNC_ON_COMMIT, AUDIT_ORPHAN_SCAN_INTERVAL)
+
+
+def _make_record(obj: Any, action: AuditAction,
+                 before: Optional[dict[str, Any]], after: Optional[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "event_id": str(uuid.uuid4()),
+        "entity_type": AUDITED_MODELS[type(obj)].value,
+        "entity_id": obj.id,
+        "action": action.value,
+        "before": _json_safe(jsonable_encoder(before)),
+        "after": _json_safe(jsonable_encoder(after)),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _json_safe(value: Any) -> Any:
+    # Float columns accept NaN and infinities, which the Postgres json type rejects.
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def _column_values(obj: Any) -> dict[str, Any]:
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+def _column_changes(obj: Any) -> tuple[dict[str, Any], dict[str, Any]]:
+    state = inspect(obj)
+    before, after = {}, {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.has_changes():
+            before[attr.key] = history.deleted[0] if history.deleted else None
+            after[attr.key] = history.added[0] if history.added else None
+    return before, after
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_changes(session: Session, _flush_context):
+    pending = session.info.setdefault("audit_pending", [])
+
+    for obj in session.new:
+        if type(obj) in AUDITED_MODELS:
+            pending.append(_make_record(obj, AuditAction.CREATE, None, _column_values(obj)))
+
+    for obj in session.dirty:
+        if type(obj) in AUDITED_MODELS:
+            before, after = _column_changes(obj)
+            if after:
+                pending.append(_make_record(obj, AuditAction.UPDATE, before, after))
+
+    for obj in session.deleted:
+        if type(obj) in AUDITED_MODELS:
+            pending.append(_make_record(obj, AuditAction.DELETE, _column_values(obj), None))
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_changes(session: Session):
+    # The transaction is already committed here, so journaling problems are
+    # handled inside ``submit`` and never reach the request.
+    records = session.info.pop("audit_pending", None)
+    if records:
+        audit_writer.submit(records)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop("audit_pending", None)
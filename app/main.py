@@ -3,21 +3,30 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from app.audit import audit_writer
 from app.database import engine, Base
+from app.models import AuditLogModel
 from app.api.patients_api import router as patient_router
 from app.api.visits_api import router as visits_router
 from app.api.measurements_api import router as measurements_router
+from app.api.audit_api import router as audit_router
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     try:
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)
+            # The audit log is the GCP record of every change and survives the reset of the
+            # clinical tables; entity ids restart after a reset, so entries from earlier
+            # runs are told apart by created_at.
+            clinical_tables = [t for t in Base.metadata.sorted_tables if t is not AuditLogModel.__table__]
+            await conn.run_sync(Base.metadata.drop_all, tables=clinical_tables)
             await conn.run_sync(Base.metadata.create_all)
     except Exception:
         raise
+    await audit_writer.start()
     yield
+    await audit_writer.stop()
     await engine.dispose()
 
 
@@ -32,4 +41,5 @@ app.add_middleware(
 
 app.include_router(patient_router, prefix="/api/v1", tags=["patients"])
 app.include_router(visits_router, prefix="/api/v1", tags=["visits"])
-app.include_router(measurements_router, prefix="/api/v1", tags=["measurements"])
\ No newline at end of file
+app.include_router(measurements_router, prefix="/api/v1", tags=["measurements"])
+app.include_router(audit_router, prefix="/api/v1", tags=["audit"])
\ No newline at end of file
@@ -1,6 +1,6 @@
 from enum import Enum
 
-from sqlalchemy import Column, BigInteger, String, DateTime, func, ForeignKey, JSON, Text, Float
+from sqlalchemy import Column, BigInteger, String, DateTime, func, ForeignKey, JSON, Text, Float, Index, Uuid
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -34,6 +34,18 @@ class UserRole(str, Enum):
     VIEWER = "viewer"
 
 
+class AuditAction(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class AuditEntityType(str, Enum):
+    PATIENT = "patient"
+    VISIT = "visit"
+    MEASUREMENT = "measurement"
+
+
 class UserModel(Base):
     __tablename__ = "users"
 
@@ -118,3 +130,22 @@ class MeasurementModel(Base):
 
     patient = relationship("PatientModel", back_populates="measurements")
     visit = relationship("VisitModel", back_populates="measurements")
+
+
+class AuditLogModel(Base):
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix_audit_log_entity_created_at", "entity_type", "entity_id", "created_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(Uuid, unique=True, nullable=False)
+
+    entity_type = Column(String(50), nullable=False)
+    entity_id = Column(BigInteger, nullable=False)
+    action = Column(String(20), nullable=False)
+
+    before = Column(JSON, nullable=True)
+    after = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
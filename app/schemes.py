@@ -1,9 +1,10 @@
 from datetime import datetime
+from uuid import UUID
 from typing import Optional, Dict, Any
 
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 
-from app.models import Gender, PatientStatus, VisitType
+from app.models import Gender, PatientStatus, VisitType, AuditAction, AuditEntityType
 
 
 class PatientBase(BaseModel):
@@ -103,3 +104,16 @@ class Measurement(MeasurementBase):
     updated_at: Optional[datetime]
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class AuditEntry(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    event_id: UUID
+    entity_type: AuditEntityType
+    entity_id: int
+    action: AuditAction
+    before: Optional[Dict[str, Any]]
+    after: Optional[Dict[str, Any]]
+    created_at: datetime
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional, List
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database import get_db
+from app.models import AuditLogModel, AuditEntityType
+
+
+class AuditService:
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def list_entity_history(
+            self, entity_type: AuditEntityType, entity_id: int,
+            since: Optional[datetime] = None, until: Optional[datetime] = None,
+            offset: int = 0, limit: int = 50
+    ) -> List[AuditLogModel]:
+        stmt = select(AuditLogModel).where(
+            AuditLogModel.entity_type == entity_type.value,
+            AuditLogModel.entity_id == entity_id,
+        )
+        if since is not None:
+            stmt = stmt.where(AuditLogModel.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(AuditLogModel.created_at < until)
+        stmt = stmt.order_by(AuditLogModel.created_at, AuditLogModel.id).offset(offset).limit(limit)
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
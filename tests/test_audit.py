@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from app.audit import AuditWriter, _column_values, _make_record
+from app.models import AuditAction, MeasurementModel
+
+
+class FakeDatabase:
+    """Stands in for ``AuditWriter._insert``; a batch is stored all-or-nothing like a transaction."""
+
+    def __init__(self):
+        self.rows = {}
+        self.down = False
+
+    async def insert(self, records):
+        await asyncio.sleep(0)
+        if self.down:
+            raise OperationalError("INSERT INTO audit_log", {}, ConnectionError("connection refused"))
+        for record in records:
+            if record.get("poison"):
+                raise DataError("INSERT INTO audit_log", {}, ValueError("invalid input syntax for type json"))
+        for record in records:
+            self.rows[record["event_id"]] = record
+
+
+def make_record(**extra):
+    return {
+        "event_id": str(uuid.uuid4()),
+        "entity_type": "patient",
+        "entity_id": 1,
+        "action": "create",
+        "before": None,
+        "after": {"status": "screening"},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **extra,
+    }
+
+
+def make_writer(journal_dir, db, **kwargs):
+    options = dict(queue_size=100, batch_size=10, flush_interval=0.02, segment_size=50, orphan_scan_interval=0.05)
+    options.update(kwargs)
+    writer = AuditWriter(str(journal_dir), **options)
+    writer._insert = db.insert
+    return writer
+
+
+def segment_files(journal_dir):
+    return [name for name in os.listdir(journal_dir) if name.endswith(".jsonl") and name != "dead-letter.jsonl"]
+
+
+async def wait_until(condition, timeout=3.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_queue_overflow_is_replayed_from_journal(tmp_path):
+    db = FakeDatabase()
+    records = [make_record() for _ in range(40)]
+
+    async def scenario():
+        writer = make_writer(tmp_path, db, queue_size=5)
+        await writer.start()
+        for record in records:
+            writer.submit([record])
+        await wait_until(lambda: len(db.rows) == len(records))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert set(db.rows) == {r["event_id"] for r in records}
+    assert segment_files(tmp_path) == []
+
+
+def test_failed_insert_is_retried_without_loss(tmp_path):
+    db = FakeDatabase()
+    db.down = True
+    records = [make_record() for _ in range(25)]
+
+    async def scenario():
+        writer = make_writer(tmp_path, db)
+        await writer.start()
+        for record in records:
+            writer.submit([record])
+        await asyncio.sleep(0.1)
+        assert db.rows == {}
+        db.down = False
+        await wait_until(lambda: len(db.rows) == len(records))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert segment_files(tmp_path) == []
+
+
+def test_poison_record_is_dead_lettered(tmp_path):
+    db = FakeDatabase()
+    poison = make_record(poison=True)
+    records = [make_record() for _ in range(30)]
+
+    async def scenario():
+        writer = make_writer(tmp_path, db, queue_size=5)
+        await writer.start()
+        writer.submit([poison])
+        for record in records:
+            writer.submit([record])
+        await wait_until(lambda: len(db.rows) == len(records))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert poison["event_id"] not in db.rows
+    assert segment_files(tmp_path) == []
+    with open(tmp_path / "dead-letter.jsonl", encoding="utf-8") as dead_letter:
+        entries = [json.loads(line) for line in dead_letter]
+    assert [entry["record"]["event_id"] for entry in entries] == [poison["event_id"]]
+
+
+def test_stop_stores_pending_records(tmp_path):
+    db = FakeDatabase()
+    records = [make_record() for _ in range(15)]
+
+    async def scenario():
+        writer = make_writer(tmp_path, db, flush_interval=60)
+        await writer.start()
+        for record in records:
+            writer.submit([record])
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert set(db.rows) == {r["event_id"] for r in records}
+    assert segment_files(tmp_path) == []
+
+
+def test_journal_is_replayed_after_unclean_stop(tmp_path):
+    db = FakeDatabase()
+    db.down = True
+    records = [make_record() for _ in range(15)]
+
+    async def first_run():
+        writer = make_writer(tmp_path, db)
+        await writer.start()
+        for record in records:
+            writer.submit([record])
+        await writer.stop()
+
+    asyncio.run(first_run())
+    assert db.rows == {}
+    assert len(segment_files(tmp_path)) == 1
+
+    db.down = False
+
+    async def second_run():
+        writer = make_writer(tmp_path, db)
+        await writer.start()
+        await wait_until(lambda: len(db.rows) == len(records))
+        await writer.stop()
+
+    asyncio.run(second_run())
+    assert segment_files(tmp_path) == []
+
+
+def test_orphaned_segment_is_claimed_while_running(tmp_path):
+    db = FakeDatabase()
+    records = [make_record() for _ in range(12)]
+
+    async def scenario():
+        writer = make_writer(tmp_path, db)
+        await writer.start()
+        with open(tmp_path / "other-host-1-dead.jsonl", "w", encoding="utf-8") as journal:
+            journal.writelines(json.dumps(record) + "\n" for record in records)
+        await wait_until(lambda: len(db.rows) == len(records))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert segment_files(tmp_path) == []
+
+
+def test_fsync_on_commit_runs_in_background(tmp_path, monkeypatch):
+    db = FakeDatabase()
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+
+    async def scenario():
+        writer = make_writer(tmp_path, db, flush_interval=60, fsync_on_commit=True)
+        await writer.start()
+        writer.submit([make_record()])
+        assert synced == []
+        await wait_until(lambda: len(synced) == 1)
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_non_finite_floats_are_recorded_as_strings():
+    measurement = MeasurementModel(id=1, patient_id=1, metric_name="weight", value_numeric=float("nan"))
+    record = _make_record(measurement, AuditAction.CREATE, None, _column_values(measurement))
+
+    assert record["after"]["value_numeric"] == "nan"
+    json.dumps(record, allow_nan=False)